@@ -0,0 +1,95 @@
+import glob
+import os
+import time
+import numpy as np
+
+import bestfit
+import fastfit
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+
+csv_folder = "csvs"
+
+# Synthetic stacks: (number of pixels, number of dates)
+SYNTHETIC_SIZES = [(1000, 70), (10000, 70), (100000, 70)]
+
+# curve_fit is timed on at most this many pixels and extrapolated
+CURVE_FIT_SAMPLE = 200
+
+NOISE_M = 0.003  # per-epoch noise (m)
+
+# ==========================================
+# HELPERS
+# ==========================================
+
+def synthetic_stack(n_pix, n_dates, seed=0):
+    """Random two-segment series over ~5 years with noise and 5% missing epochs."""
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(0, 5, n_dates))
+    x -= x[0]
+    k = rng.uniform(1, 4, n_pix)
+    m1 = rng.normal(0, 0.01, n_pix)
+    m2 = rng.normal(-0.03, 0.01, n_pix)
+    hinge = np.maximum(x[:, None] - k[None, :], 0)
+    stack = m1 * x[:, None] + (m2 - m1) * hinge + rng.normal(0, NOISE_M, (n_dates, n_pix))
+    stack[rng.random(stack.shape) < 0.05] = np.nan
+    return x, stack, k
+
+def time_curve_fit(x, stack):
+    """Seconds per pixel for the current bestfit (curve_fit) approach."""
+    n = min(CURVE_FIT_SAMPLE, stack.shape[1])
+    t0 = time.perf_counter()
+    for p in range(n):
+        valid = np.isfinite(stack[:, p])
+        try:
+            bestfit.fit_piecewise(x[valid], stack[valid, p])
+        except Exception:
+            pass
+    return (time.perf_counter() - t0) / n
+
+def time_fast(x, stack, accelerate):
+    t0 = time.perf_counter()
+    result = fastfit.fit_stack(x, stack, accelerate=accelerate)
+    return time.perf_counter() - t0, result
+
+# ==========================================
+# BENCHMARKS
+# ==========================================
+
+def bench_csv_samples():
+    print("1. csvs/ samples: curve_fit vs fastfit")
+    print(f"   {'file':<34}{'k cf':>8}{'k fast':>8}{'v2 cf':>9}{'v2 fast':>9}{'P(brk)':>8}")
+    for path in sorted(glob.glob(os.path.join(csv_folder, "*.csv"))):
+        _, _, x, y = bestfit.load_series(path)
+        try:
+            k_cf, _, _, m2_cf = bestfit.fit_piecewise(x, y)
+        except Exception:
+            k_cf = m2_cf = np.nan
+        r = fastfit.fit_stack(x, y[:, None])
+        print(f"   {os.path.basename(path):<34}{k_cf:8.3f}{r['k'][0]:8.3f}"
+              f"{m2_cf * 1000:9.2f}{r['m2'][0] * 1000:9.2f}{r['break_prob'][0]:8.2f}")
+
+def bench_synthetic():
+    print("2. Synthetic stacks (wall time)")
+    modes = [False] + ([True] if fastfit.HAVE_NUMBA else [])
+    if fastfit.HAVE_NUMBA:
+        # Warm up the JIT so compile time is not counted
+        x, stack, _ = synthetic_stack(10, 20)
+        fastfit.fit_stack(x, stack, accelerate=True)
+
+    for n_pix, n_dates in SYNTHETIC_SIZES:
+        x, stack, k_true = synthetic_stack(n_pix, n_dates)
+        per_pixel = time_curve_fit(x, stack)
+        line = f"   {n_pix:>7} px x {n_dates} dates | curve_fit ~{per_pixel * n_pix:8.2f} s (extrapolated)"
+        for accelerate in modes:
+            elapsed, result = time_fast(x, stack, accelerate)
+            name = "numba" if accelerate else "numpy"
+            err = np.nanmedian(np.abs(result['k'] - k_true))
+            line += f" | {name} {elapsed:7.3f} s ({per_pixel * n_pix / elapsed:6.0f}x, |dk| {err:.3f} yr)"
+        print(line)
+
+if __name__ == "__main__":
+    bench_csv_samples()
+    bench_synthetic()
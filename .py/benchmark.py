@@ -0,0 +1,343 @@
+import datetime
+import json
+import os
+import platform
+import runpy
+import shutil
+import subprocess
+import sys
+import time
+import numpy as np
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+AOI_PATH = os.path.join(os.path.dirname(SCRIPTS_DIR), "AOI.geojson")
+
+# Synthetic inputs are generated once per scale and reused
+data_folder = "benchmark_data"
+results_folder = "benchmarks"
+
+# Scale 1.0 = real Lucknow dimensions; smaller scales shrink building count and pixel count together
+SCALES = [0.01, 0.1, 1.0]
+
+# Real dimensions (from the csvs/ exports: 20 m pixels, 172 epochs at 12-day spacing)
+PIXEL_SIZE_M = 20.0
+N_DATES = 172
+DATE_STEP_DAYS = 12
+FIRST_DATE = datetime.date(2020, 1, 7)
+N_BUILDINGS = 640000
+
+# The velocity/time series rasters are labelled 32643 like the real exports,
+# while the AOI and building coordinates are true 32644 (geo.py detects the real zone)
+RASTER_EPSG = 32643
+AOI_EPSG = 32644
+
+# Buildings are scattered over the AOI plus this margin so clipping has work to do
+BUILDING_MARGIN = 0.1
+
+# Skip the Google tile download in building_zoning.py so runs are offline and repeatable
+OFFLINE_BASEMAP = True
+
+# geo.py's persisted reprojection cache (geo.CACHE_FOLDER). Every step is timed cold (cache
+# wiped first); the steps that read vectors through geo.py are then timed again warm, with the
+# cache left by the cold pass and by the previous warm step's save_vector
+GEO_CACHE = ".geo_cache"
+WARM_STEPS = ["clipping", "zonal_stats", "zoning_render", "hotspots"]
+
+STEP_TIMEOUT = 3600
+SEED = 0
+
+velocity_files = [
+    "20_velocity.tif", "21_velocity.tif", "22_velocity.tif", "23_velocity.tif",
+    "24_velocity.tif", "25_velocity.tif", "20_21_velocity.tif", "22_23_velocity.tif",
+    "24_25_velocity.tif", "20_25_velocity.tif"
+]
+
+# Files and folders each step writes into the workdir; cleared before every run so
+# each step does its full work (hotspots.py skips rasters it has already processed)
+STEP_OUTPUTS = {
+    "tiftocsv": ["timeseries_georeferenced.csv"],
+    "clipping": ["clipped_output.geojson"],
+    "zonal_stats": ["buildings_with_velocity.geojson"],
+    "zoning_render": ["building_zoning.png"],
+    "png_render": ["velocity_pngs"],
+    "pixel_fit": ["timeseries_breakpoints.tif"],
+    "denoise": ["timeseries_cleaned.tif"],
+    "hotspots": ["hotspots"],
+}
+
+# (name, script) in pipeline order; later steps read earlier outputs
+STEPS = [
+    ("tiftocsv", "tiftocsv.py"),
+    ("clipping", "vector_clipping.py"),
+    ("zonal_stats", "zonalstats.py"),
+    ("zoning_render", "building_zoning.py"),
+    ("png_render", "tiftopng.py"),
+    ("pixel_fit", "fastfit.py"),
+    ("denoise", "denoise.py"),
+    ("hotspots", "hotspots.py"),
+]
+
+# ==========================================
+# SYNTHETIC INPUTS
+# ==========================================
+
+def _aoi_bounds():
+    with open(AOI_PATH) as f:
+        coords = np.array(json.load(f)['features'][0]['geometry']['coordinates'][0])
+    return coords[:, 0].min(), coords[:, 1].min(), coords[:, 0].max(), coords[:, 1].max()
+
+def _velocity_field(rng, shape, res):
+    """Smooth background plus a few subsidence bowls (m/yr)."""
+    from scipy import ndimage
+    field = ndimage.gaussian_filter(rng.normal(0, 1, shape), sigma=max(1.0, 500 / res))
+    field *= 0.01 / field.std()
+    rows, cols = np.mgrid[0:shape[0], 0:shape[1]]
+    for _ in range(6):
+        r, c = rng.uniform(0, shape[0]), rng.uniform(0, shape[1])
+        radius = rng.uniform(300, 1500) / res
+        field -= rng.uniform(0.03, 0.08) * np.exp(-((rows - r) ** 2 + (cols - c) ** 2) / (2 * radius ** 2))
+    return field
+
+def generate_inputs(workdir, scale, seed=SEED):
+    """
+    Write synthetic inputs with the real file names into workdir
+
+    Parameters:
+    workdir: folder to write into (reused if it already holds this scale)
+    scale: fraction of the real building and pixel counts
+    """
+    import geopandas as gpd
+    import rasterio
+    import shapely
+    from rasterio.transform import from_origin
+
+    params = {'scale': scale, 'seed': seed, 'pixel_size_m': PIXEL_SIZE_M, 'n_dates': N_DATES,
+              'n_buildings': N_BUILDINGS, 'raster_epsg': RASTER_EPSG}
+    marker = os.path.join(workdir, "inputs.json")
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == params:
+                print(f"   Reusing synthetic inputs in {workdir}")
+                return params
+    os.makedirs(workdir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    minx, miny, maxx, maxy = _aoi_bounds()
+    shutil.copy(AOI_PATH, os.path.join(workdir, "AOI.geojson"))
+
+    # Rasters: pixel count scales with `scale`
+    res = PIXEL_SIZE_M / np.sqrt(scale)
+    width = int(np.ceil((maxx - minx) / res))
+    height = int(np.ceil((maxy - miny) / res))
+    profile = dict(driver='GTiff', width=width, height=height, dtype='float32', nodata=np.nan,
+                   crs=f"EPSG:{RASTER_EPSG}", transform=from_origin(minx, maxy, res, res),
+                   tiled=True, blockxsize=256, blockysize=256)
+    print(f"   Rasters: {height} x {width} at {res:.1f} m, {N_DATES} dates")
+
+    velocity = _velocity_field(rng, (height, width), res)
+    holes = rng.random((height, width)) < 0.02  # decorrelated pixels
+    for path in velocity_files:
+        v = (velocity * rng.uniform(0.7, 1.3) + rng.normal(0, 0.003, velocity.shape)).astype('float32')
+        v[holes] = np.nan
+        with rasterio.open(os.path.join(workdir, path), 'w', count=1, **profile) as dst:
+            dst.write(v, 1)
+
+    dates = [FIRST_DATE + datetime.timedelta(days=DATE_STEP_DAYS * i) for i in range(N_DATES)]
+    years = np.array([(d - FIRST_DATE).days / 365.25 for d in dates])
+    with rasterio.open(os.path.join(workdir, "timeseries_georeferenced.tif"), 'w',
+                       count=N_DATES, **profile) as dst:
+        for i, (d, t) in enumerate(zip(dates, years)):
+            band = (velocity * t + rng.normal(0, 0.004, velocity.shape)).astype('float32')
+            band[holes] = np.nan
+            dst.write(band, i + 1)
+            dst.set_band_description(i + 1, d.strftime('%Y%m%d'))
+
+    # Buildings: random footprints in true 32644 coordinates, saved as EPSG:4326 like the source layer
+    n = int(N_BUILDINGS * scale)
+    print(f"   Buildings: {n}")
+    dx, dy = (maxx - minx) * BUILDING_MARGIN, (maxy - miny) * BUILDING_MARGIN
+    cx = rng.uniform(minx - dx, maxx + dx, n)
+    cy = rng.uniform(miny - dy, maxy + dy, n)
+    half_w, half_h = rng.uniform(3, 15, n), rng.uniform(3, 15, n)
+    geoms = shapely.box(cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+    buildings = gpd.GeoDataFrame({'id': np.arange(n)}, geometry=geoms, crs=f"EPSG:{AOI_EPSG}")
+    buildings.to_crs(epsg=4326).to_file(os.path.join(workdir, "Buildings_Lucknow.geojson"), driver='GeoJSON')
+
+    with open(marker, 'w') as f:
+        json.dump(params, f, indent=2)
+    return params
+
+# ==========================================
+# TIMING AND MEMORY (each step runs in a fresh process)
+# ==========================================
+
+def clear_outputs(workdir, steps=None):
+    """Delete earlier outputs of the given steps (default all, plus run reports), keeping the synthetic inputs."""
+    if steps is None:
+        names = [f for outputs in STEP_OUTPUTS.values() for f in outputs] + ["run_reports"]
+    else:
+        names = [f for step in steps for f in STEP_OUTPUTS.get(step, [])]
+    for name in names:
+        path = os.path.join(workdir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+def _peak_rss_mb():
+    # VmHWM belongs to this process image; ru_maxrss can carry over the parent's peak on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _child(script):
+    # Runs inside the subprocess: execute the script as __main__ and report wall time and peak RSS
+    sys.path.insert(0, SCRIPTS_DIR)
+    if OFFLINE_BASEMAP and os.path.basename(script) == "building_zoning.py":
+        import contextily
+        contextily.add_basemap = lambda *args, **kwargs: None
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    # Name the instrument run report after the script rather than benchmark.py
+    sys.argv = [script]
+    _reset_peak_rss()
+    t0 = time.perf_counter()
+    runpy.run_path(script, run_name="__main__")
+    elapsed = time.perf_counter() - t0
+
+    print("BENCHMARK_RESULT " + json.dumps({'seconds': elapsed, 'peak_rss_mb': _peak_rss_mb()}))
+
+def _span_report(report_dir):
+    # Newest instrument.py run report written by the step, if any
+    reports = sorted(f for f in os.listdir(report_dir) if f.endswith(".json") and "speedscope" not in f) \
+        if os.path.isdir(report_dir) else []
+    if not reports:
+        return None
+    with open(os.path.join(report_dir, reports[-1])) as f:
+        return json.load(f)['spans']
+
+def run_step(script, workdir, geo_cache='cold'):
+    """
+    Run one script in workdir; returns a dict with seconds, peak_rss_mb, status and stage spans
+
+    geo_cache: 'cold' wipes the geometry cache first, 'warm' keeps whatever earlier runs left
+    """
+    if geo_cache == 'cold':
+        shutil.rmtree(os.path.join(workdir, GEO_CACHE), ignore_errors=True)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", os.path.join(SCRIPTS_DIR, script)]
+    report_dir = os.path.join(workdir, "run_reports", f"{os.path.splitext(script)[0]}_{geo_cache}")
+    env = dict(os.environ, INSAR_REPORT="1", INSAR_REPORT_DIR=report_dir)
+    try:
+        proc = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True,
+                              timeout=STEP_TIMEOUT, env=env)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout', 'seconds': STEP_TIMEOUT}
+
+    for line in proc.stdout.splitlines():
+        if line.startswith("BENCHMARK_RESULT "):
+            result = json.loads(line[len("BENCHMARK_RESULT "):])
+            result['status'] = 'ok'
+            result['geo_cache'] = geo_cache
+            result['spans'] = _span_report(report_dir)
+            return result
+    err = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+    return {'status': 'error', 'error': err}
+
+def _environment():
+    env = {'python': platform.python_version(), 'platform': platform.platform(),
+           'cpu_count': os.cpu_count()}
+    for name in ["numpy", "scipy", "rasterio", "geopandas", "shapely", "pyproj", "numba"]:
+        try:
+            env[name] = __import__(name).__version__
+        except ImportError:
+            env[name] = None
+    return env
+
+def run_benchmarks(scales=SCALES, steps=STEPS):
+    """
+    Generate inputs and time every step at every scale (cold geometry cache), then time
+    WARM_STEPS again with the cache kept; saves results as JSON
+
+    Returns: path of the results file
+    """
+    os.makedirs(results_folder, exist_ok=True)
+    report = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+              'environment': _environment(), 'runs': []}
+
+    for scale in scales:
+        workdir = os.path.abspath(os.path.join(data_folder, f"scale_{scale}"))
+        print(f"Scale {scale}: preparing inputs...")
+        t0 = time.perf_counter()
+        params = generate_inputs(workdir, scale)
+        clear_outputs(workdir)
+        run = {'scale': scale, 'inputs': params,
+               'generate_seconds': time.perf_counter() - t0, 'steps': {}, 'warm_steps': {}}
+
+        passes = [('steps', 'cold', steps),
+                  ('warm_steps', 'warm', [(n, s) for n, s in steps if n in WARM_STEPS])]
+        for key, geo_cache, pass_steps in passes:
+            for name, script in pass_steps:
+                if geo_cache == 'warm':
+                    clear_outputs(workdir, [name])
+                result = run_step(script, workdir, geo_cache)
+                run[key][name] = result
+                label = f"{name} ({geo_cache})"
+                if result['status'] == 'ok':
+                    print(f"   {label:<22}{result['seconds']:9.2f} s {result['peak_rss_mb']:9.0f} MB")
+                else:
+                    print(f"   {label:<22} {result['status']}: {result.get('error', '')}")
+        report['runs'].append(run)
+
+    stamp = report['timestamp'].replace(':', '').replace('-', '')
+    out_path = os.path.join(results_folder, f"benchmark_{stamp}.json")
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved: {out_path}")
+    return out_path
+
+def compare(old_json, new_json):
+    """Print per-step time and memory ratios (new / old) between two results files."""
+    with open(old_json) as f:
+        old = {r['scale']: r for r in json.load(f)['runs']}
+    with open(new_json) as f:
+        new = {r['scale']: r for r in json.load(f)['runs']}
+
+    print(f"{'scale':>7} {'step':<14}{'cache':<6}{'old s':>9}{'new s':>9}{'time x':>8}{'mem x':>8}")
+    for scale in sorted(set(old) & set(new)):
+        for key, geo_cache in [('steps', 'cold'), ('warm_steps', 'warm')]:
+            for name, b in new[scale].get(key, {}).items():
+                a = old[scale].get(key, {}).get(name)
+                if not a or a['status'] != 'ok' or b['status'] != 'ok':
+                    continue
+                print(f"{scale:>7} {name:<14}{geo_cache:<6}{a['seconds']:9.2f}{b['seconds']:9.2f}"
+                      f"{b['seconds'] / a['seconds']:8.2f}{b['peak_rss_mb'] / a['peak_rss_mb']:8.2f}")
+
+if __name__ == "__main__":
+    # python benchmark.py                      -> run all scales
+    # python benchmark.py 0.01 0.1             -> run selected scales
+    # python benchmark.py compare old.json new.json
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        _child(sys.argv[2])
+    elif len(sys.argv) == 4 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        run_benchmarks([float(s) for s in sys.argv[1:]] or SCALES)
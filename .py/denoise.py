@@ -0,0 +1,188 @@
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from scipy import ndimage
+
+from fastfit import dates_to_years
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+
+input_file = "timeseries_georeferenced.tif"
+output_file = "timeseries_cleaned.tif"
+
+# Rows per block (all bands, full width); memory is ~ (BLOCK_ROWS + 2*halo) x width x dates x 16 bytes
+BLOCK_ROWS = 256
+
+# Robust rolling median (in epochs). HAMPEL_SIGMA replaces only points further than
+# HAMPEL_SIGMA robust std from the median; None replaces every point with the median.
+MEDIAN_WINDOW = 5
+HAMPEL_SIGMA = 3.0
+
+# Savitzky-Golay on the real (irregular) acquisition dates; set SAVGOL_WINDOW=None to skip
+SAVGOL_WINDOW = 7
+SAVGOL_ORDER = 2
+
+# Optional APS filter: atmosphere is spatially smooth but temporally random, so the
+# spatial low-pass of the temporal high-pass residual is removed from every epoch.
+APS_FILTER = False
+APS_SPATIAL_SIGMA_PX = 20
+APS_TEMPORAL_DAYS = 120
+
+# ==========================================
+# TIME-AXIS OPERATORS (built once from the dates, applied to all pixels as one matmul)
+# ==========================================
+
+def savgol_matrix(x, window, order):
+    """
+    Savitzky-Golay smoothing on irregular sample positions
+
+    Row t holds the weights of a degree `order` polynomial fitted to the `window`
+    nearest epochs (shifted inwards at the ends) and evaluated at x[t].
+    """
+    n_t = len(x)
+    window = min(window, n_t)
+    half = window // 2
+    C = np.zeros((n_t, n_t))
+    for t in range(n_t):
+        lo = min(max(t - half, 0), n_t - window)
+        idx = np.arange(lo, lo + window)
+        V = np.vander(x[idx] - x[t], order + 1, increasing=True)
+        C[t, idx] = np.linalg.pinv(V)[0]
+    return C
+
+def gaussian_time_matrix(x, sigma_years):
+    """Row-normalised Gaussian low-pass on irregular dates."""
+    K = np.exp(-0.5 * ((x[:, None] - x[None, :]) / sigma_years) ** 2)
+    return K / K.sum(axis=1, keepdims=True)
+
+# ==========================================
+# STAGES (Y is (n_dates, n_pixels))
+# ==========================================
+
+def fill_gaps(x, Y):
+    """Linear interpolation of NaN epochs in time; ends hold the nearest valid value."""
+    n_t = len(x)
+    valid = np.isfinite(Y)
+    t, p = np.nonzero(~valid)
+    if len(t) == 0:
+        return Y
+
+    idx = np.arange(n_t, dtype=np.int32)[:, None]
+    prev = np.maximum.accumulate(np.where(valid, idx, -1), axis=0)[t, p]
+    nxt = np.minimum.accumulate(np.where(valid, idx, n_t)[::-1], axis=0)[::-1][t, p]
+
+    # Interpolate only the missing entries
+    lo = np.clip(prev, 0, n_t - 1)
+    hi = np.clip(nxt, 0, n_t - 1)
+    y_lo, y_hi = Y[lo, p], Y[hi, p]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w = (x[t] - x[lo]) / (x[hi] - x[lo])
+    filled = y_lo + w * (y_hi - y_lo)
+    filled = np.where(prev < 0, y_hi, np.where(nxt >= n_t, y_lo, filled))
+
+    out = Y.copy()
+    out[t, p] = filled
+    return out
+
+def rolling_median(Y, window=MEDIAN_WINDOW, hampel_sigma=HAMPEL_SIGMA):
+    """Rolling median along time; with hampel_sigma only outliers are replaced."""
+    med = ndimage.median_filter(Y, size=(window, 1), mode='nearest')
+    if hampel_sigma is None:
+        return med
+    dev = np.abs(Y - med)
+    mad = ndimage.median_filter(dev, size=(window, 1), mode='nearest')
+    return np.where(dev > hampel_sigma * 1.4826 * mad, med, Y)
+
+def remove_aps(Y, shape, lowpass, sigma_px=APS_SPATIAL_SIGMA_PX):
+    """
+    Subtract the atmospheric phase screen estimate from a block
+
+    Parameters:
+    Y: (n_dates, n_pixels) gap-filled series
+    shape: (rows, cols) of the block
+    lowpass: temporal low-pass operator from gaussian_time_matrix
+    """
+    valid = np.isfinite(Y[0]).reshape(shape).astype(np.float64)
+    hp = np.nan_to_num(Y - lowpass @ Y).reshape((-1,) + shape)
+    sigma = (0, sigma_px, sigma_px)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aps = ndimage.gaussian_filter(hp * valid, sigma) / ndimage.gaussian_filter(valid, sigma[1:])
+    return Y - aps.reshape(Y.shape)
+
+def time_operators(x, aps_filter=APS_FILTER):
+    """Savitzky-Golay and APS low-pass operators for these dates (None where disabled)."""
+    savgol = savgol_matrix(x, SAVGOL_WINDOW, SAVGOL_ORDER) if SAVGOL_WINDOW else None
+    lowpass = gaussian_time_matrix(x, APS_TEMPORAL_DAYS / 365.25) if aps_filter else None
+    return savgol, lowpass
+
+def clean_stack(x, stack, aps_filter=APS_FILTER, operators=None, sigma_px=None):
+    """
+    Run the enabled stages on an in-memory stack
+
+    Parameters:
+    x: epochs in years (n_dates,), sorted ascending
+    stack: (n_dates, rows, cols) displacement array; NaN = missing epoch
+    operators: (savgol, lowpass) from time_operators; built here if not given
+    sigma_px: APS spatial sigma in pixels (default APS_SPATIAL_SIGMA_PX)
+
+    Returns: cleaned float64 array of the same shape
+    """
+    savgol, lowpass = operators if operators is not None else time_operators(x, aps_filter)
+    n_t, shape = stack.shape[0], stack.shape[1:]
+    Y = fill_gaps(x, stack.reshape(n_t, -1).astype(np.float64))
+    if MEDIAN_WINDOW:
+        Y = rolling_median(Y, MEDIAN_WINDOW, HAMPEL_SIGMA)
+    if aps_filter:
+        Y = remove_aps(Y, shape, lowpass, APS_SPATIAL_SIGMA_PX if sigma_px is None else sigma_px)
+    if savgol is not None:
+        Y = savgol @ Y
+    return Y.reshape(stack.shape)
+
+# ==========================================
+# BLOCK-WISE RASTER PIPELINE
+# ==========================================
+
+def clean_raster(input_tif, output_tif, aps_filter=APS_FILTER, block_rows=BLOCK_ROWS):
+    """
+    Denoise a multi-band time series GeoTIFF block by block into the same layout
+
+    Parameters:
+    input_tif: time series GeoTIFF with YYYYMMDD band descriptions
+    output_tif: cleaned GeoTIFF (same bands, descriptions and georeferencing)
+    """
+    # The spatial APS filter needs neighbouring rows around every block;
+    # the same sigma is passed to every block so the halo always matches it
+    sigma_px = APS_SPATIAL_SIGMA_PX
+    halo = int(np.ceil(4 * sigma_px)) if aps_filter else 0
+
+    with rasterio.open(input_tif) as src:
+        x, _ = dates_to_years(src.descriptions)
+        operators = time_operators(x, aps_filter)
+        profile = src.profile
+        if np.dtype(profile['dtype']).kind != 'f':
+            profile.update(dtype='float32')
+        profile.update(nodata=np.nan)
+        print(f"Cleaning {src.count} dates x {src.height} x {src.width} in blocks of {block_rows} rows...")
+
+        with rasterio.open(output_tif, 'w', **profile) as dst:
+            for i, desc in enumerate(src.descriptions):
+                dst.set_band_description(i + 1, desc)
+
+            for row in range(0, src.height, block_rows):
+                n_rows = min(block_rows, src.height - row)
+                top = max(row - halo, 0)
+                bottom = min(row + n_rows + halo, src.height)
+                data = src.read(window=Window(0, top, src.width, bottom - top)).astype(np.float64)
+                if src.nodata is not None:
+                    data[data == src.nodata] = np.nan
+
+                cleaned = clean_stack(x, data, aps_filter=aps_filter, operators=operators, sigma_px=sigma_px)
+                cleaned = cleaned[:, row - top:row - top + n_rows]
+                dst.write(cleaned.astype(profile['dtype']), window=Window(0, row, src.width, n_rows))
+
+    print(f"Done! Saved cleaned stack to {output_tif}")
+
+if __name__ == "__main__":
+    clean_raster(input_file, output_file)
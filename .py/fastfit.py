@@ -0,0 +1,344 @@
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+import datetime
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+
+# Multi-core acceleration flag:
+# "auto" = numba when installed, True = require numba, False = NumPy (chunked BLAS) path
+ACCELERATE = "auto"
+
+# Minimum number of valid epochs on each side of a breakpoint
+MIN_SEGMENT = 5
+
+# Pixels per block for the NumPy path (keeps the (pixels x dates) temporaries small)
+CHUNK_SIZE = 16384
+
+# Rows read per block in fit_raster (all dates, full width)
+BLOCK_ROWS = 256
+
+input_file = "timeseries_georeferenced.tif"
+output_file = "timeseries_breakpoints.tif"
+
+# Output bands, in order. Slopes in m/yr, breakpoints in years since the first date.
+FIELDS = [
+    "k", "m1", "c1", "m2",               # continuous two-segment model (same params as bestfit.piecewise_linear)
+    "slope", "intercept",                # plain linear model
+    "bic_linear", "bic_piecewise",
+    "use_piecewise",                     # 1 where BIC prefers the breakpoint model
+    "acceleration",                      # m2 - m1
+    "break_prob",                        # BIC weight of the breakpoint model (0..1)
+    "k_lo", "k_hi",                      # ~95% profile-likelihood interval of the breakpoint
+]
+
+# chi-square (1 dof, 95%) cut-off for the breakpoint interval
+CI_THRESHOLD = 3.84
+TINY = 1e-30
+
+# ==========================================
+# SHARED ARITHMETIC (works on scalars and arrays)
+# ==========================================
+
+def _solve3(a, b, c, d, e, f, r0, r1, r2):
+    # Solve the symmetric system [[a,b,c],[b,d,e],[c,e,f]] @ beta = r by cofactors.
+    # No allocation for scalars, fully broadcast for arrays.
+    c00 = d * f - e * e
+    c01 = c * e - b * f
+    c02 = b * e - c * d
+    c11 = a * f - c * c
+    c12 = b * c - a * e
+    c22 = a * d - b * b
+    det = a * c00 + b * c01 + c * c02
+    b0 = (c00 * r0 + c01 * r1 + c02 * r2) / det
+    b1 = (c01 * r0 + c11 * r1 + c12 * r2) / det
+    b2 = (c02 * r0 + c12 * r1 + c22 * r2) / det
+    return b0, b1, b2, det
+
+def _bic(n, rss, n_params):
+    return n * np.log(np.maximum(rss, TINY) / n) + n_params * np.log(n)
+
+def _break_prob(bic_linear, bic_piecewise):
+    d = np.minimum(np.maximum((bic_piecewise - bic_linear) / 2.0, -700.0), 700.0)
+    return 1.0 / (1.0 + np.exp(d))
+
+# ==========================================
+# NUMBA KERNEL (one pixel per iteration, no allocation)
+# ==========================================
+
+def _fit_pixel(x, y, min_seg, res):
+    n_t = x.shape[0]
+    for f in range(res.shape[0]):
+        res[f] = np.nan
+
+    # Sums that do not depend on the breakpoint
+    n = 0.0
+    sx = 0.0
+    sxx = 0.0
+    sy = 0.0
+    sxy = 0.0
+    syy = 0.0
+    for i in range(n_t):
+        yi = y[i]
+        if yi == yi:
+            xi = x[i]
+            n += 1.0
+            sx += xi
+            sxx += xi * xi
+            sy += yi
+            sxy += xi * yi
+            syy += yi * yi
+    if n < 3.0:
+        return
+
+    # Plain linear model
+    den = n * sxx - sx * sx
+    if den <= 0.0:
+        return
+    slope = (n * sxy - sx * sy) / den
+    intercept = (sy - slope * sx) / n
+    rss_lin = max(syy - intercept * sy - slope * sxy, 0.0)
+    bic_lin = _bic(n, rss_lin, 2.0)
+    res[4] = slope
+    res[5] = intercept
+    res[6] = bic_lin
+
+    # Two-segment model: for a fixed k it is linear in (c1, m1, m2 - m1)
+    # with the hinge h = max(x - k, 0), so scan k over the sample dates.
+    # Walking backwards, the hinge sums follow from suffix sums in O(1) per k.
+    best_rss = np.inf
+    best_j = -1
+    for p in range(2):
+        cnt = 0.0
+        tx = 0.0
+        txx = 0.0
+        ty = 0.0
+        txy = 0.0
+        for j in range(n_t - 1, -1, -1):
+            yj = y[j]
+            if yj != yj:
+                continue
+            k = x[j]
+            # cnt/tx/... hold the valid samples after j; left = samples before j
+            left = n - cnt - 1.0
+            if left >= min_seg and cnt + 1.0 >= min_seg:
+                sh = tx - k * cnt
+                sxh = txx - k * tx
+                shh = txx - 2.0 * k * tx + k * k * cnt
+                shy = txy - k * ty
+                b0, b1, b2, det = _solve3(n, sx, sh, sxx, sxh, shh, sy, sxy, shy)
+                if det > 0.0:
+                    rss = max(syy - b0 * sy - b1 * sxy - b2 * shy, 0.0)
+                    if p == 0:
+                        if rss < best_rss:
+                            best_rss = rss
+                            best_j = j
+                            res[0] = k
+                            res[1] = b1
+                            res[2] = b0
+                            res[3] = b1 + b2
+                    elif n * np.log(max(rss, TINY) / max(best_rss, TINY)) <= CI_THRESHOLD:
+                        # Second pass: widen the breakpoint interval
+                        if res[12] != res[12]:
+                            res[12] = k
+                        res[11] = k
+            cnt += 1.0
+            tx += k
+            txx += k * k
+            ty += yj
+            txy += k * yj
+        if best_j < 0:
+            return
+
+    bic_pw = _bic(n, best_rss, 4.0)
+    res[7] = bic_pw
+    res[8] = 1.0 if bic_pw < bic_lin else 0.0
+    res[9] = res[3] - res[1]
+    res[10] = _break_prob(bic_lin, bic_pw)
+
+def _fit_all(x, Y, min_seg, out):
+    for p in prange(Y.shape[0]):
+        _fit_pixel(x, Y[p], min_seg, out[p])
+
+# The NumPy path keeps the plain Python helpers
+_solve3_np, _bic_np, _break_prob_np = _solve3, _bic, _break_prob
+
+if HAVE_NUMBA:
+    _solve3 = njit(_solve3, cache=True, error_model='numpy')
+    _bic = njit(_bic, cache=True)
+    _break_prob = njit(_break_prob, cache=True)
+    _fit_pixel = njit(_fit_pixel, cache=True, error_model='numpy')
+    _fit_all = njit(_fit_all, parallel=True, cache=True)
+
+# ==========================================
+# NUMPY FALLBACK (all breakpoints at once, chunked BLAS)
+# ==========================================
+
+def _fit_chunk_numpy(x, Y, min_seg):
+    n_pix, n_t = Y.shape
+    out = np.full((n_pix, len(FIELDS)), np.nan)
+
+    W = np.isfinite(Y).astype(np.float64)
+    Y0 = np.where(W > 0, Y, 0.0)
+
+    n = W.sum(axis=1)
+    sx = W @ x
+    sxx = W @ (x * x)
+    sy = Y0.sum(axis=1)
+    sxy = Y0 @ x
+    syy = np.einsum('ij,ij->i', Y0, Y0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Plain linear model
+        den = n * sxx - sx * sx
+        slope = (n * sxy - sx * sy) / den
+        intercept = (sy - slope * sx) / n
+        rss_lin = np.maximum(syy - intercept * sy - slope * sxy, 0.0)
+        ok_lin = (n >= 3) & (den > 0)
+        bic_lin = np.where(ok_lin, _bic_np(n, rss_lin, 2.0), np.nan)
+        out[:, 4] = np.where(ok_lin, slope, np.nan)
+        out[:, 5] = np.where(ok_lin, intercept, np.nan)
+        out[:, 6] = bic_lin
+
+        # Hinge matrix for every candidate breakpoint: H[i, j] = max(x_i - x_j, 0)
+        H = np.maximum(x[:, None] - x[None, :], 0.0)
+        sh = W @ H
+        sxh = W @ (x[:, None] * H)
+        shh = W @ (H * H)
+        shy = Y0 @ H
+
+        nc, sxc, sxxc = n[:, None], sx[:, None], sxx[:, None]
+        syc, sxyc, syyc = sy[:, None], sxy[:, None], syy[:, None]
+        b0, b1, b2, det = _solve3_np(nc, sxc, sh, sxxc, sxh, shh, syc, sxyc, shy)
+        rss = np.maximum(syyc - b0 * syc - b1 * sxyc - b2 * shy, 0.0)
+
+        left = np.cumsum(W, axis=1) - W
+        cand = (W > 0) & (left >= min_seg) & (nc - left >= min_seg) & (det > 0) & ok_lin[:, None]
+        rss = np.where(cand, rss, np.inf)
+
+        best_j = np.argmin(rss, axis=1)
+        rows = np.arange(n_pix)
+        best_rss = rss[rows, best_j]
+        ok_pw = np.isfinite(best_rss)
+
+        k = x[best_j]
+        m1 = b1[rows, best_j]
+        out[:, 0] = np.where(ok_pw, k, np.nan)
+        out[:, 1] = np.where(ok_pw, m1, np.nan)
+        out[:, 2] = np.where(ok_pw, b0[rows, best_j], np.nan)
+        out[:, 3] = np.where(ok_pw, m1 + b2[rows, best_j], np.nan)
+
+        bic_pw = np.where(ok_pw, _bic_np(n, best_rss, 4.0), np.nan)
+        out[:, 7] = bic_pw
+        out[:, 8] = np.where(ok_pw, (bic_pw < bic_lin).astype(np.float64), np.nan)
+        out[:, 9] = out[:, 3] - out[:, 1]
+        out[:, 10] = np.where(ok_pw, _break_prob_np(bic_lin, bic_pw), np.nan)
+
+        # Profile-likelihood interval of the breakpoint
+        lr = nc * np.log(np.maximum(rss, TINY) / np.maximum(best_rss, TINY)[:, None])
+        in_ci = cand & (lr <= CI_THRESHOLD)
+        k_lo = np.where(in_ci, x[None, :], np.inf).min(axis=1)
+        k_hi = np.where(in_ci, x[None, :], -np.inf).max(axis=1)
+        out[:, 11] = np.where(ok_pw, k_lo, np.nan)
+        out[:, 12] = np.where(ok_pw, k_hi, np.nan)
+
+    return out
+
+# ==========================================
+# PUBLIC API
+# ==========================================
+
+def use_numba(accelerate=None):
+    """Resolve the acceleration flag to True (numba) or False (NumPy)."""
+    if accelerate is None:
+        accelerate = ACCELERATE
+    if accelerate == "auto":
+        return HAVE_NUMBA
+    if accelerate and not HAVE_NUMBA:
+        raise ImportError("ACCELERATE=True requires numba (pip install numba)")
+    return bool(accelerate)
+
+def fit_stack(x, stack, min_seg=MIN_SEGMENT, accelerate=None, chunk_size=CHUNK_SIZE):
+    """
+    Fit linear and continuous two-segment models to every pixel of a time series stack
+
+    Parameters:
+    x: 1D array of epochs in years, sorted ascending (n_dates,)
+    stack: displacement array shaped (n_dates, ...) e.g. (bands, rows, cols); NaN = missing epoch
+    min_seg: minimum number of valid epochs on each side of the breakpoint
+    accelerate: overrides ACCELERATE ("auto", True, False)
+    chunk_size: pixels per block for the NumPy path
+
+    Returns: dict of FIELDS -> arrays shaped like stack.shape[1:]
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    stack = np.asarray(stack)
+    spatial_shape = stack.shape[1:]
+    # Pixel-major layout so each pixel's series is contiguous
+    Y = np.ascontiguousarray(stack.reshape(stack.shape[0], -1).T, dtype=np.float64)
+
+    out = np.empty((Y.shape[0], len(FIELDS)))
+    if use_numba(accelerate):
+        _fit_all(x, Y, float(min_seg), out)
+    else:
+        for start in range(0, Y.shape[0], chunk_size):
+            out[start:start + chunk_size] = _fit_chunk_numpy(x, Y[start:start + chunk_size], min_seg)
+
+    return {name: out[:, i].reshape(spatial_shape) for i, name in enumerate(FIELDS)}
+
+def dates_to_years(dates):
+    """Convert YYYYMMDD band descriptions to years since the first date."""
+    parsed = [datetime.datetime.strptime(d.strip(), "%Y%m%d") for d in dates]
+    start = min(parsed)
+    return np.array([(d - start).days / 365.25 for d in parsed]), start
+
+def fit_raster(input_tif, output_tif, accelerate=None, block_rows=BLOCK_ROWS):
+    """
+    Fit every pixel of the multi-band time series GeoTIFF and save the FIELDS as bands
+
+    Pixels are independent, so the stack is read and fitted in row blocks
+    (all dates, full width) to keep memory bounded.
+
+    Parameters:
+    input_tif: time series GeoTIFF with YYYYMMDD band descriptions
+    output_tif: path to the output float32 GeoTIFF (one band per FIELDS entry)
+    block_rows: rows read per block
+    """
+    mode = "numba" if use_numba(accelerate) else "NumPy"
+    n_break = 0
+
+    with rasterio.open(input_tif) as src:
+        x, start_date = dates_to_years(src.descriptions)
+        profile = src.profile
+        profile.update(count=len(FIELDS), dtype='float32', nodata=np.nan)
+        print(f"Fitting {src.height * src.width} pixels x {src.count} dates "
+              f"in blocks of {block_rows} rows ({mode})...")
+
+        with rasterio.open(output_tif, 'w', **profile) as dst:
+            for i, name in enumerate(FIELDS):
+                dst.set_band_description(i + 1, name)
+            dst.update_tags(start_date=start_date.strftime('%Y%m%d'))
+
+            for row in range(0, src.height, block_rows):
+                window = Window(0, row, src.width, min(block_rows, src.height - row))
+                data = src.read(window=window)
+                if src.nodata is not None:
+                    data = np.where(data == src.nodata, np.nan, data)
+
+                result = fit_stack(x, data, accelerate=accelerate)
+                dst.write(np.stack([result[name] for name in FIELDS]).astype('float32'), window=window)
+                n_break += int(np.nansum(result['use_piecewise']))
+
+    print(f"Done! {n_break} pixels prefer a breakpoint. Saved to {output_tif}")
+    return output_tif
+
+if __name__ == "__main__":
+    fit_raster(input_file, output_file)
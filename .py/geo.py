@@ -0,0 +1,220 @@
+import functools
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import rasterio
+import shapely
+from pyproj import CRS, Transformer
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+
+# Where the study area really is (Lucknow). Used to tell which UTM zone a file's
+# coordinates belong to, whatever its metadata claims.
+STUDY_AREA_LONLAT = (80.95, 26.85)
+MAX_OFFSET_DEG = 2.0
+
+# Zones the inputs are known to come in (the velocity exports say 32643, the AOI 32644)
+CANDIDATE_EPSG = [32644, 32643, 4326]
+
+# Reprojected geometry arrays, one file per source file and target CRS
+CACHE_FOLDER = ".geo_cache"
+
+# Bumped when the cache layout changes; older caches are rebuilt
+CACHE_VERSION = 2
+
+# ==========================================
+# CRS DETECTION AND TRANSFORMERS
+# ==========================================
+
+def to_epsg(crs):
+    """EPSG code (int) for an int, 'EPSG:xxxx' string, pyproj/rasterio CRS or None."""
+    if crs is None or isinstance(crs, (int, np.integer)):
+        return None if crs is None else int(crs)
+    return CRS.from_user_input(crs).to_epsg()
+
+@functools.lru_cache(maxsize=None)
+def get_transformer(src_epsg, dst_epsg):
+    """Cached pyproj Transformer (x/y = lon/lat order for geographic CRS)."""
+    return Transformer.from_crs(src_epsg, dst_epsg, always_xy=True)
+
+def transform_xy(x, y, src_crs, dst_crs):
+    """Reproject coordinate arrays with a cached transformer."""
+    src, dst = to_epsg(src_crs), to_epsg(dst_crs)
+    if src == dst:
+        return np.asarray(x), np.asarray(y)
+    return get_transformer(src, dst).transform(x, y)
+
+def _offset_deg(x, y, epsg):
+    lon, lat = get_transformer(epsg, 4326).transform(x, y)
+    return np.hypot(lon - STUDY_AREA_LONLAT[0], lat - STUDY_AREA_LONLAT[1])
+
+def detect_crs(x, y, labelled=None):
+    """
+    Work out the true CRS of coordinates from where they land
+
+    Parameters:
+    x, y: a representative coordinate (e.g. the centre of a file's bounds)
+    labelled: CRS from the file's metadata, kept whenever it places the data in the study area
+
+    Returns: EPSG code (int)
+    """
+    labelled = to_epsg(labelled)
+    geographic = abs(x) <= 180 and abs(y) <= 90
+    candidates = [4326] if geographic else [c for c in CANDIDATE_EPSG if c != 4326]
+    if labelled is not None and (labelled == 4326) == geographic:
+        candidates = [labelled] + [c for c in candidates if c != labelled]
+
+    offsets = [_offset_deg(x, y, c) for c in candidates]
+    if offsets[0] <= MAX_OFFSET_DEG:
+        return candidates[0]
+    best = int(np.argmin(offsets))
+    if offsets[best] > MAX_OFFSET_DEG:
+        raise ValueError(f"Coordinates ({x:.1f}, {y:.1f}) are not near the study area in any of {candidates}")
+    if labelled is not None:
+        print(f"   Note: data labelled EPSG:{labelled} is really EPSG:{candidates[best]}")
+    return candidates[best]
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime, st.st_size
+
+@functools.lru_cache(maxsize=None)
+def _raster_crs(path, mtime, size):
+    with rasterio.open(path) as src:
+        b = src.bounds
+        return detect_crs((b.left + b.right) / 2, (b.bottom + b.top) / 2, src.crs)
+
+def raster_crs(path):
+    """True EPSG code of a raster (its metadata may name the wrong UTM zone)."""
+    return _raster_crs(*_fingerprint(path))
+
+# ==========================================
+# PERSISTED GEOMETRY CACHE
+# ==========================================
+
+def _ragged_arrays(geoms):
+    # Missing or empty geometries do not survive a ragged round trip (from_ragged_array can
+    # crash on them), so those layers go through WKB
+    if shapely.is_missing(geoms).any() or shapely.is_empty(geoms).any():
+        return None
+    try:
+        geom_type, coords, offsets = shapely.to_ragged_array(geoms)
+    except (ValueError, TypeError):
+        return None
+    arrays = {'kind': np.array('ragged'), 'geom_type': np.array(int(geom_type)), 'coords': coords,
+              'type_ids': shapely.get_type_id(geoms).astype('int8')}
+    arrays.update({f"offsets_{i}": o for i, o in enumerate(offsets)})
+    return arrays
+
+def _save_geometry(path, geoms):
+    # Ragged coordinate arrays are fastest to load; WKB covers mixed, missing or empty geometries
+    arrays = _ragged_arrays(geoms)
+    if arrays is None:
+        wkb = shapely.to_wkb(geoms)
+        lengths = np.array([-1 if b is None else len(b) for b in wkb], dtype='int64')
+        blob = np.frombuffer(b"".join(b for b in wkb if b is not None), dtype='uint8')
+        arrays = {'kind': np.array('wkb'), 'lengths': lengths, 'blob': blob}
+    np.savez(path, **arrays)
+
+def _load_geometry(path):
+    with np.load(path) as z:
+        if str(z['kind']) == 'ragged':
+            n_off = len([k for k in z.files if k.startswith("offsets_")])
+            offsets = tuple(z[f"offsets_{i}"] for i in range(n_off))
+            geoms = shapely.from_ragged_array(shapely.GeometryType(int(z['geom_type'])), z['coords'], offsets)
+            # Mixed Polygon/MultiPolygon layers come back as all-multi; restore single parts
+            single = z['type_ids'] != int(z['geom_type'])
+            if single.any():
+                geoms[single] = shapely.get_geometry(geoms[single], 0)
+            return geoms
+
+        lengths, blob = z['lengths'], z['blob'].tobytes()
+        ends = np.cumsum(np.maximum(lengths, 0))
+        wkb = [None if n < 0 else blob[e - n:e] for n, e in zip(lengths, ends)]
+        return shapely.from_wkb(np.array(wkb, dtype=object))
+
+def _reproject_geoms(geoms, src_epsg, dst_epsg):
+    tr = get_transformer(src_epsg, dst_epsg)
+    return shapely.transform(geoms, lambda xy: np.column_stack(tr.transform(xy[:, 0], xy[:, 1])))
+
+def _cache_folder(path):
+    abspath, mtime, size = _fingerprint(path)
+    key = f"{os.path.splitext(os.path.basename(path))[0]}_{hashlib.md5(abspath.encode()).hexdigest()[:8]}"
+    return os.path.join(CACHE_FOLDER, key), {'path': abspath, 'mtime': mtime, 'size': size}
+
+def _seed_cache(folder, state, gdf):
+    # Store attributes and native geometry for a freshly read (or written) file,
+    # indexed the way reading the file back would be
+    gdf = gdf.reset_index(drop=gdf.index.name is None)
+    os.makedirs(folder, exist_ok=True)
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    bounds = gdf.total_bounds
+    native = detect_crs((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2, gdf.crs)
+    pd.DataFrame(gdf.drop(columns=gdf.geometry.name)).to_pickle(os.path.join(folder, "attributes.pkl"))
+    geoms = gdf.geometry.to_numpy()
+    geom_path = os.path.join(folder, f"geometry_{native}.npz")
+    _save_geometry(geom_path, geoms)
+
+    # meta.json marks the cache valid, so it is written only once the geometry reads back
+    loaded = _load_geometry(geom_path)
+    missing = shapely.is_missing(geoms)
+    if len(loaded) != len(geoms) or (shapely.is_missing(loaded) != missing).any() \
+            or not shapely.equals_exact(loaded[~missing], geoms[~missing], tolerance=0).all():
+        raise ValueError(f"Geometry cache for {state['path']} did not round-trip")
+    meta = {'version': CACHE_VERSION, 'source': state, 'native_epsg': native}
+    with open(os.path.join(folder, "meta.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def load_vector(path, target_crs=None):
+    """
+    Read a vector file in its true CRS or in target_crs, via the geometry cache
+
+    The first call parses the file, detects its CRS and stores the attributes plus the
+    geometry arrays; each new target CRS is projected once and stored next to them.
+
+    Parameters:
+    path: GeoJSON / shapefile / GeoPackage path
+    target_crs: EPSG code or CRS to return (None = the file's true CRS)
+
+    Returns: GeoDataFrame
+    """
+    folder, state = _cache_folder(path)
+    meta_path = os.path.join(folder, "meta.json")
+
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_VERSION or meta['source'] != state:
+            meta = None
+    if meta is None:
+        meta = _seed_cache(folder, state, gpd.read_file(path))
+
+    native = meta['native_epsg']
+    target = native if target_crs is None else to_epsg(target_crs)
+    geom_path = os.path.join(folder, f"geometry_{target}.npz")
+    if os.path.exists(geom_path):
+        geoms = _load_geometry(geom_path)
+    else:
+        geoms = _reproject_geoms(_load_geometry(os.path.join(folder, f"geometry_{native}.npz")), native, target)
+        _save_geometry(geom_path, geoms)
+
+    attrs = pd.read_pickle(os.path.join(folder, "attributes.pkl"))
+    return gpd.GeoDataFrame(attrs, geometry=gpd.GeoSeries(geoms, index=attrs.index, crs=f"EPSG:{target}"))
+
+def save_vector(gdf, path, driver='GeoJSON'):
+    """
+    Write a GeoDataFrame and seed the geometry cache from memory
+
+    The next step that calls load_vector on this file skips parsing it again.
+    """
+    gdf.to_file(path, driver=driver)
+    folder, state = _cache_folder(path)
+    _seed_cache(folder, state, gdf)
@@ -0,0 +1,312 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import rasterio
+from rasterio.features import shapes
+from rasterio.windows import Window
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from shapely.geometry import shape
+
+import geo
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+
+# Any single-band velocity raster or derived product (e.g. a fastfit band)
+velocity_files = [
+    "20_velocity.tif",
+    "21_velocity.tif",
+    "22_velocity.tif",
+    "23_velocity.tif",
+    "24_velocity.tif",
+    "25_velocity.tif",
+    "20_21_velocity.tif",
+    "22_23_velocity.tif",
+    "24_25_velocity.tif",
+    "20_25_velocity.tif"
+]
+
+# Buildings to count per zone (set to None to skip)
+buildings_file = "buildings_with_velocity.geojson"
+
+output_folder = "hotspots"
+manifest_file = os.path.join(output_folder, "hotspots_manifest.json")
+
+# Pixels at or below THRESHOLD (m/yr) are subsiding; set BELOW=False for "at or above"
+THRESHOLD = -0.02
+BELOW = True
+BAND = 1
+
+# 8-connectivity joins diagonal neighbours, 4-connectivity does not
+CONNECTIVITY = 8
+
+# Zones smaller than this many pixels are dropped
+MIN_PIXELS = 10
+
+# Rows read per strip; memory use is ~ TILE_ROWS x width x 20 bytes
+TILE_ROWS = 1024
+
+# ==========================================
+# STREAMING LABELLING
+# ==========================================
+
+def _strips(height, tile_rows):
+    for row in range(0, height, tile_rows):
+        yield row, min(tile_rows, height - row)
+
+def _boundary_pairs(prev_row, cur_row, connectivity):
+    # Provisional labels that touch across a strip boundary
+    pairs = []
+    shifts = [0] if connectivity == 4 else [-1, 0, 1]
+    for s in shifts:
+        if s < 0:
+            a, b = prev_row[:s], cur_row[-s:]
+        elif s > 0:
+            a, b = prev_row[s:], cur_row[:-s]
+        else:
+            a, b = prev_row, cur_row
+        touch = (a > 0) & (b > 0)
+        pairs.append(np.stack([a[touch], b[touch]], axis=1))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+def label_raster(input_tif, label_tif, threshold=THRESHOLD, below=BELOW, band=BAND,
+                 connectivity=CONNECTIVITY, min_pixels=MIN_PIXELS, tile_rows=TILE_ROWS):
+    """
+    Label connected hotspot regions strip by strip and stitch them across strip boundaries
+
+    Parameters:
+    input_tif: velocity (or derived) GeoTIFF
+    label_tif: output int32 GeoTIFF of zone ids (0 = background)
+
+    Returns: DataFrame of per-zone stats indexed by zone_id
+    """
+    structure = np.ones((3, 3)) if connectivity == 8 else None
+
+    with rasterio.open(input_tif) as src:
+        # Label raster carries the true CRS, not the zone the source metadata names
+        profile = src.profile
+        profile.update(count=1, dtype='int32', nodata=0, compress='deflate',
+                       crs=f"EPSG:{geo.raster_crs(input_tif)}")
+        height, width = src.height, src.width
+        pixel_area = abs(src.transform.a * src.transform.e)
+
+        counts, sums, sumsqs, mins = [], [], [], []
+        row0s, row1s, col0s, col1s = [], [], [], []
+        pairs = []
+        n_prov = 0
+        prev_row = None
+
+        # Pass 1: label each strip, keep per-label sums and the boundary links
+        with rasterio.open(label_tif, 'w+', **profile) as dst:
+            for row, n_rows in _strips(height, tile_rows):
+                window = Window(0, row, width, n_rows)
+                # Compare in the raster's own precision so edge pixels match the source
+                data = src.read(band, window=window).astype('float32', copy=False)
+                if src.nodata is not None:
+                    data[data == src.nodata] = np.nan
+                with np.errstate(invalid='ignore'):
+                    mask = data <= threshold if below else data >= threshold
+
+                lab, n = ndimage.label(mask, structure=structure)
+                lab = lab.astype('int32')
+                if n:
+                    index = np.arange(1, n + 1)
+                    flat = lab.ravel()
+                    vals = np.where(mask, data, 0.0).astype('float64').ravel()
+                    counts.append(np.bincount(flat, minlength=n + 1)[1:])
+                    sums.append(np.bincount(flat, weights=vals, minlength=n + 1)[1:])
+                    sumsqs.append(np.bincount(flat, weights=vals * vals, minlength=n + 1)[1:])
+                    mins.append(ndimage.minimum(data, lab, index))
+                    for sl in ndimage.find_objects(lab):
+                        row0s.append(sl[0].start + row)
+                        row1s.append(sl[0].stop + row)
+                        col0s.append(sl[1].start)
+                        col1s.append(sl[1].stop)
+                    lab[lab > 0] += n_prov
+
+                if prev_row is not None:
+                    pairs.append(_boundary_pairs(prev_row, lab[0], connectivity))
+                prev_row = lab[-1].copy()
+                n_prov += n
+                dst.write(lab, 1, window=window)
+
+            if n_prov == 0:
+                print("   No pixels passed the threshold.")
+                return _empty_stats()
+
+            # Merge provisional labels that touch across strips
+            links = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype='int32')
+            graph = coo_matrix((np.ones(len(links)), (links[:, 0] - 1, links[:, 1] - 1)),
+                               shape=(n_prov, n_prov))
+            n_comp, comp = connected_components(graph, directed=False)
+
+            count = np.bincount(comp, weights=np.concatenate(counts), minlength=n_comp)
+            total = np.bincount(comp, weights=np.concatenate(sums), minlength=n_comp)
+            total_sq = np.bincount(comp, weights=np.concatenate(sumsqs), minlength=n_comp)
+            vmin = np.full(n_comp, np.inf)
+            np.minimum.at(vmin, comp, np.concatenate(mins))
+            bbox = [np.full(n_comp, np.iinfo('int64').max), np.full(n_comp, -1),
+                    np.full(n_comp, np.iinfo('int64').max), np.full(n_comp, -1)]
+            np.minimum.at(bbox[0], comp, row0s)
+            np.maximum.at(bbox[1], comp, row1s)
+            np.minimum.at(bbox[2], comp, col0s)
+            np.maximum.at(bbox[3], comp, col1s)
+
+            # Final zone ids, dropping small components
+            keep = count >= min_pixels
+            zone_of_comp = np.zeros(n_comp, dtype='int32')
+            zone_of_comp[keep] = np.arange(1, keep.sum() + 1)
+            lookup = np.zeros(n_prov + 1, dtype='int32')
+            lookup[1:] = zone_of_comp[comp]
+
+            # Pass 2: rewrite provisional labels as zone ids
+            for row, n_rows in _strips(height, tile_rows):
+                window = Window(0, row, width, n_rows)
+                dst.write(lookup[dst.read(1, window=window)], 1, window=window)
+
+    mean = total / np.maximum(count, 1)
+    stats = pd.DataFrame({
+        'zone_id': zone_of_comp[keep],
+        'n_pixels': count[keep].astype('int64'),
+        'area_m2': count[keep] * pixel_area,
+        'vel_mean': mean[keep],
+        'vel_min': vmin[keep],
+        'vel_std': np.sqrt(np.maximum(total_sq / np.maximum(count, 1) - mean ** 2, 0))[keep],
+        'row_min': bbox[0][keep], 'row_max': bbox[1][keep] - 1,
+        'col_min': bbox[2][keep], 'col_max': bbox[3][keep] - 1,
+    }).set_index('zone_id')
+    return stats
+
+def _empty_stats():
+    return pd.DataFrame(columns=['n_pixels', 'area_m2', 'vel_mean', 'vel_min', 'vel_std',
+                                 'row_min', 'row_max', 'col_min', 'col_max'],
+                        index=pd.Index([], name='zone_id'))
+
+# ==========================================
+# BUILDINGS AND POLYGONS
+# ==========================================
+
+def count_buildings(label_tif, buildings_path, tile_rows=TILE_ROWS):
+    """
+    Count buildings per zone using each building's representative point
+
+    Parameters:
+    label_tif: zone id GeoTIFF from label_raster
+    buildings_path: building footprints (any CRS; read pre-projected from the geo cache)
+
+    Returns: Series of building counts indexed by zone_id
+    """
+    buildings = geo.load_vector(buildings_path, geo.raster_crs(label_tif))
+    with rasterio.open(label_tif) as src:
+        pts = buildings.geometry.representative_point()
+        rows, cols = rasterio.transform.rowcol(src.transform, pts.x.values, pts.y.values)
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+        rows, cols = rows[inside], cols[inside]
+
+        zones = np.zeros(len(rows), dtype='int32')
+        for row, n_rows in _strips(src.height, tile_rows):
+            sel = (rows >= row) & (rows < row + n_rows)
+            if sel.any():
+                lab = src.read(1, window=Window(0, row, src.width, n_rows))
+                zones[sel] = lab[rows[sel] - row, cols[sel]]
+
+    zones = zones[zones > 0]
+    return pd.Series(np.bincount(zones), name='n_buildings').iloc[1:].rename_axis('zone_id')
+
+def zone_polygons(label_tif, tile_rows=TILE_ROWS):
+    """Polygonise the zone id raster strip by strip and dissolve pieces per zone."""
+    ids, geoms = [], []
+    crs = f"EPSG:{geo.raster_crs(label_tif)}"
+    with rasterio.open(label_tif) as src:
+        for row, n_rows in _strips(src.height, tile_rows):
+            window = Window(0, row, src.width, n_rows)
+            lab = src.read(1, window=window)
+            for geom, value in shapes(lab, mask=lab > 0, transform=src.window_transform(window)):
+                ids.append(int(value))
+                geoms.append(shape(geom))
+    gdf = gpd.GeoDataFrame({'zone_id': ids}, geometry=geoms, crs=crs)
+    return gdf.dissolve(by='zone_id')
+
+# ==========================================
+# INCREMENTAL PIPELINE
+# ==========================================
+
+def _params():
+    return {'threshold': THRESHOLD, 'below': BELOW, 'band': BAND,
+            'connectivity': CONNECTIVITY, 'min_pixels': MIN_PIXELS}
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return {'mtime': st.st_mtime, 'size': st.st_size}
+
+def detect_hotspots(input_tif, buildings_path=None):
+    """
+    Threshold, label and polygonise one raster; writes <name>_zones.tif and <name>_hotspots.geojson
+
+    Parameters:
+    input_tif: velocity (or derived) GeoTIFF
+    buildings_path: optional building footprints file to count per zone
+    """
+    name = os.path.splitext(os.path.basename(input_tif))[0]
+    label_tif = os.path.join(output_folder, f"{name}_zones.tif")
+    vector_out = os.path.join(output_folder, f"{name}_hotspots.geojson")
+
+    # Pass the current config explicitly so it matches what the manifest records
+    stats = label_raster(input_tif, label_tif, threshold=THRESHOLD, below=BELOW, band=BAND,
+                         connectivity=CONNECTIVITY, min_pixels=MIN_PIXELS, tile_rows=TILE_ROWS)
+    print(f"   {len(stats)} zones")
+    if len(stats) == 0:
+        # Don't leave polygons from an earlier run looking current
+        if os.path.exists(vector_out):
+            os.remove(vector_out)
+        return label_tif
+
+    zones = zone_polygons(label_tif).join(stats)
+    if buildings_path is not None:
+        zones = zones.join(count_buildings(label_tif, buildings_path))
+        zones['n_buildings'] = zones['n_buildings'].fillna(0).astype('int64')
+    zones.reset_index().to_file(vector_out, driver='GeoJSON')
+    print(f"   Saved: {vector_out}")
+    return vector_out
+
+def run(files=velocity_files, force=False):
+    """Process every raster whose file or parameters changed since the last run."""
+    os.makedirs(output_folder, exist_ok=True)
+    manifest = {}
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    buildings_state = None
+    if buildings_file and os.path.exists(buildings_file):
+        buildings_state = _fingerprint(buildings_file)
+
+    for path in files:
+        if not os.path.exists(path):
+            print(f"Skipping (not found): {path}")
+            continue
+
+        state = {'input': _fingerprint(path), 'buildings': buildings_state, 'params': _params()}
+        entry = manifest.get(path)
+        if not force and entry and entry['state'] == state and os.path.exists(entry['output']):
+            print(f"Up to date: {path}")
+            continue
+
+        print(f"Detecting hotspots in {path}...")
+        buildings_path = buildings_file if buildings_state is not None else None
+        manifest[path] = {'state': state, 'output': detect_hotspots(path, buildings_path)}
+
+        # Save after every file so an interrupted run keeps its progress
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    print("\nAll done!")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,188 @@
+import atexit
+import cProfile
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# ==========================================
+# CONFIGURATION (environment variables)
+# ==========================================
+
+# INSAR_REPORT=0 turns off the run report and the summary table
+WRITE_REPORT = os.environ.get("INSAR_REPORT", "1") != "0"
+REPORT_FOLDER = os.environ.get("INSAR_REPORT_DIR", "run_reports")
+
+# INSAR_PROFILE=1 also dumps a cProfile .prof next to the report (open with snakeviz or pstats)
+PROFILE = os.environ.get("INSAR_PROFILE", "0") not in ("", "0")
+
+# How often the background thread samples resident memory (seconds)
+SAMPLE_INTERVAL = 0.05
+
+# ==========================================
+# MEMORY
+# ==========================================
+
+try:
+    _PAGE_MB = os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+except (AttributeError, ValueError, OSError):
+    _PAGE_MB = None
+
+def rss_mb():
+    """Current resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    if _PAGE_MB is not None:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * _PAGE_MB
+        except OSError:
+            pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+# ==========================================
+# SPANS AND RUN STATE
+# ==========================================
+
+class Span:
+    def __init__(self, name, path, unit, t0, rss):
+        self.name = name
+        self.path = path
+        self.unit = unit
+        self.items = None
+        self.start = t0
+        self.seconds = None
+        self.rss_start_mb = rss
+        self.rss_end_mb = None
+        self.peak_rss_mb = rss
+
+    def count(self, n):
+        """Add n processed items (rows, pixels, buildings...) to the span's rate counter."""
+        self.items = (self.items or 0) + int(n)
+
+    def to_dict(self):
+        rate = self.items / self.seconds if self.items is not None and self.seconds else None
+        return {'name': self.name, 'path': self.path, 'start': round(self.start, 6),
+                'seconds': self.seconds, 'items': self.items, 'unit': self.unit,
+                'items_per_second': rate, 'rss_start_mb': self.rss_start_mb,
+                'rss_end_mb': self.rss_end_mb, 'peak_rss_mb': self.peak_rss_mb}
+
+class _Run:
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.datetime.now()
+        self.t0 = time.perf_counter()
+        self.spans = []
+        self.stack = []
+        self.events = []
+        self.frames = {}
+        self.peak_rss_mb = rss_mb()
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.profiler = None
+        if PROFILE:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        threading.Thread(target=self._sample, daemon=True).start()
+
+    def now(self):
+        return time.perf_counter() - self.t0
+
+    def _sample(self):
+        while not self.done.wait(SAMPLE_INTERVAL):
+            self.update_peak()
+
+    def update_peak(self):
+        rss = rss_mb()
+        with self.lock:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+            for s in self.stack:
+                s.peak_rss_mb = max(s.peak_rss_mb, rss)
+        return rss
+
+    def event(self, kind, path):
+        frame = self.frames.setdefault(path, len(self.frames))
+        self.events.append({'type': kind, 'frame': frame, 'at': self.now()})
+
+    def finish(self):
+        self.done.set()
+        total = self.now()
+        self.update_peak()
+        if self.profiler is not None:
+            self.profiler.disable()
+        if not WRITE_REPORT:
+            return
+
+        os.makedirs(REPORT_FOLDER, exist_ok=True)
+        stem = os.path.join(REPORT_FOLDER, f"{self.name}_{self.started.strftime('%Y%m%dT%H%M%S')}")
+        report = {
+            'script': self.name, 'argv': sys.argv, 'started': self.started.isoformat(timespec='seconds'),
+            'total_seconds': total, 'peak_rss_mb': self.peak_rss_mb,
+            'spans': [s.to_dict() for s in self.spans],
+            'speedscope': stem + ".speedscope.json",
+            'cprofile': stem + ".prof" if self.profiler is not None else None,
+        }
+        with open(stem + ".json", 'w') as f:
+            json.dump(report, f, indent=2)
+
+        # Span timeline in the format py-spy writes with --format speedscope
+        with open(report['speedscope'], 'w') as f:
+            json.dump({
+                '$schema': "https://www.speedscope.app/file-format-schema.json",
+                'shared': {'frames': [{'name': p} for p in self.frames]},
+                'profiles': [{'type': 'evented', 'name': self.name, 'unit': 'seconds',
+                              'startValue': 0, 'endValue': total, 'events': self.events}],
+            }, f)
+        if self.profiler is not None:
+            self.profiler.dump_stats(report['cprofile'])
+
+        print(f"\n--- Run report: {self.name} ({total:.2f} s, peak {self.peak_rss_mb:.0f} MB) ---")
+        for s in self.spans:
+            indent = "  " * s.path.count("/")
+            rate = f"{s.items / s.seconds:,.0f} {s.unit}/s" if s.items is not None and s.seconds else ""
+            print(f"{indent + s.name:<32}{s.seconds:9.2f} s {s.peak_rss_mb:8.0f} MB  {rate}")
+        print(f"Saved: {stem}.json")
+
+_run = None
+
+def start_run(name=None):
+    """Start recording (done automatically by the first span); the report is written at exit."""
+    global _run
+    if _run is None:
+        if name is None:
+            name = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        _run = _Run(name)
+        atexit.register(_run.finish)
+    return _run
+
+@contextmanager
+def span(name, unit="items", items=None):
+    """
+    Time a named stage with peak memory and an optional items/second counter
+
+    Parameters:
+    name: stage name; nested spans are reported as parent/child
+    unit: label for the rate counter (rows, pixels, buildings...)
+    items: number of items processed, or call .count(n) on the yielded span
+    """
+    run = start_run()
+    with run.lock:
+        path = "/".join([s.name for s in run.stack] + [name])
+    s = Span(name, path, unit, run.now(), run.update_peak())
+    if items is not None:
+        s.count(items)
+    with run.lock:
+        run.stack.append(s)
+        run.spans.append(s)
+    run.event('O', path)
+    try:
+        yield s
+    finally:
+        run.event('C', path)
+        s.seconds = run.now() - s.start
+        s.rss_end_mb = run.update_peak()
+        with run.lock:
+            run.stack.remove(s)
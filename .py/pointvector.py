@@ -1,17 +1,31 @@
+import glob
+import os
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import Point
 
+import geo
+
+csv_folder = "csvs"
+
 # 1. Define the data mapping
-# We use the corrected Longitudes (shifted to Zone 44N / Lucknow)
-data = [
-    {"id": "pixel_lat26.8682_lon74.9920", "lat": 26.8682, "lon": 80.9920},
-    {"id": "pixel_lat26.8732_lon74.9886", "lat": 26.8732, "lon": 80.9886},
-    {"id": "pixel_lat26.8652_lon74.9367", "lat": 26.8652, "lon": 80.9367},
-    {"id": "pixel_lat26.8423_lon74.9242", "lat": 26.8423, "lon": 80.9242},
-    {"id": "pixel_lat26.8789_lon74.9291", "lat": 26.8789, "lon": 80.9291},
-    {"id": "pixel_lat26.8835_lon74.9423", "lat": 26.8835, "lon": 80.9423},
-]
+# Each pixel CSV carries its projected X/Y. The CSVs' own Latitude/Longitude came
+# from the wrong UTM zone, so we reproject X/Y from the zone geo detects (44N / Lucknow).
+data = []
+for path in sorted(glob.glob(os.path.join(csv_folder, "pixel_*.csv"))):
+    meta = {}
+    with open(path) as f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            parts = line.lstrip("# ").rstrip("\n").split(",")
+            if len(parts) == 2:
+                meta[parts[0]] = parts[1]
+
+    x, y = float(meta["Projected X"]), float(meta["Projected Y"])
+    epsg = geo.detect_crs(x, y, meta.get("Source CRS"))
+    lon, lat = geo.transform_xy(x, y, epsg, 4326)
+    data.append({"id": os.path.splitext(os.path.basename(path))[0], "lat": lat, "lon": lon})
 
 # 2. Create a Pandas DataFrame
 df = pd.DataFrame(data)
@@ -54,13 +54,15 @@
 
 
 import rasterio
-from rasterio.warp import transform
 import numpy as np
 import pandas as pd
+from instrument import span
+import geo
 
 def tif_to_csv(input_tif, output_csv):
     """
-    Convert multi-band GeoTIFF in EPSG:32643 to CSV with EPSG:4326 coordinates
+    Convert multi-band UTM GeoTIFF to CSV with EPSG:4326 coordinates
+    (the UTM zone is detected by geo.raster_crs, the file's label may be wrong)
     
     Parameters:
     input_tif: path to input .tif file
@@ -74,7 +76,9 @@ def tif_to_csv(input_tif, output_csv):
         print(f"Processing {n_bands} bands...")
         
         # Read all bands
-        data = src.read()  # Shape: (bands, rows, cols)
+        with span("read_raster", unit="pixels") as s:
+            data = src.read()  # Shape: (bands, rows, cols)
+            s.count(data.size)
         
         # Get the transformation
         transform_matrix = src.transform
@@ -91,11 +95,13 @@ def tif_to_csv(input_tif, output_csv):
         # Get all pixel coordinates (using first band to determine valid pixels)
         rows, cols = np.where(~np.isnan(data[0]))  # Get non-NaN pixels from first band
         
-        # Convert pixel coordinates to EPSG:32643 coordinates
-        xs, ys = rasterio.transform.xy(transform_matrix, rows, cols)
+        # Convert pixel coordinates to projected coordinates
+        with span("pixel_coords", unit="pixels", items=len(rows)):
+            xs, ys = rasterio.transform.xy(transform_matrix, rows, cols)
         
-        # Transform from EPSG:32643 to EPSG:4326
-        lons, lats = transform('EPSG:32643', 'EPSG:4326', xs, ys)
+        # Transform from the raster's true UTM zone to EPSG:4326
+        with span("reproject", unit="pixels", items=len(rows)):
+            lons, lats = geo.transform_xy(xs, ys, geo.raster_crs(input_tif), 4326)
         
         # Create DataFrame starting with coordinates
         df_data = {
@@ -104,13 +110,15 @@ def tif_to_csv(input_tif, output_csv):
         }
         
         # Add all band values
-        for i, band_name in enumerate(band_names):
-            df_data[band_name] = data[i, rows, cols]
-        
-        df = pd.DataFrame(df_data)
+        with span("build_table", unit="rows", items=len(rows)):
+            for i, band_name in enumerate(band_names):
+                df_data[band_name] = data[i, rows, cols]
+            
+            df = pd.DataFrame(df_data)
         
         # Save to CSV
-        df.to_csv(output_csv, index=False)
+        with span("write_csv", unit="rows", items=len(df)):
+            df.to_csv(output_csv, index=False)
         print(f"Conversion complete! Saved {len(df)} points to {output_csv}")
         print(f"Bands: {', '.join(band_names)}")
         print(f"Coordinate range: Lat [{df['latitude'].min():.6f}, {df['latitude'].max():.6f}], "
@@ -2,6 +2,7 @@ import rasterio
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from instrument import span
 
 # ==========================================
 # CONFIGURATION
@@ -43,7 +44,9 @@ for file_path in velocity_files:
     try:
         with rasterio.open(file_path) as src:
             # Read the first band
-            data = src.read(1)
+            with span(f"read:{file_path}", unit="pixels") as s:
+                data = src.read(1)
+                s.count(data.size)
             
             # Mask NoData values (set them to NaN so they appear transparent/white)
             if src.nodata is not None:
@@ -54,7 +57,8 @@ for file_path in velocity_files:
             fig, ax = plt.subplots(figsize=(10, 8))
             
             # Plot data with Reverse Jet (jet_r) and fixed limits
-            im = ax.imshow(data, cmap='jet_r', vmin=VMIN, vmax=VMAX)
+            with span(f"render:{file_path}", unit="pixels", items=data.size):
+                im = ax.imshow(data, cmap='jet_r', vmin=VMIN, vmax=VMAX)
             
             # Add a colorbar
             cbar = plt.colorbar(im, ax=ax, fraction=0.035, pad=0.04)
@@ -73,7 +77,8 @@ for file_path in velocity_files:
             output_path = os.path.join(output_folder, output_name)
             
             # 'bbox_inches' ensures the labels aren't cut off
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
+            with span(f"save_png:{file_path}"):
+                plt.savefig(output_path, dpi=300, bbox_inches='tight')
             plt.close(fig) # Close memory
             
             print(f"Saved: {output_path}")
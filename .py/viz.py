@@ -8,13 +8,13 @@ from tkinter import ttk
 from tkinter import filedialog  
 import datetime
 import csv                    
-from rasterio.warp import transform
+import geo
 
 # ==========================================
 # USER CONFIGURATION
 # ==========================================
 
-SOURCE_CRS = 'EPSG:32643'  # Update if your zone is different
+SOURCE_CRS = None  # None = detect the true zone from the time series raster (e.g. 'EPSG:32644' to force)
 
 velocity_files = [
     "20_velocity.tif",
@@ -86,6 +86,7 @@ class ScrollableInsarViewer:
         self.velocity_paths = velocity_paths
         self.ts_src = rasterio.open(ts_path)
         self.dates = self.extract_dates() # Load dates once
+        self.source_crs = SOURCE_CRS or f"EPSG:{geo.raster_crs(ts_path)}"
         self.ax_maps = []
         self.opened_srcs = []
         
@@ -166,9 +167,8 @@ class ScrollableInsarViewer:
 
             # --- Coordinate Transform ---
             try:
-                lons, lats = transform(SOURCE_CRS, 'EPSG:4326', [x_proj], [y_proj])
-                lon, lat = lons[0], lats[0]
-                title_text = (f"Pixel: {x_proj:.2f}, {y_proj:.2f} ({SOURCE_CRS})\n"
+                lon, lat = geo.transform_xy(x_proj, y_proj, self.source_crs, 4326)
+                title_text = (f"Pixel: {x_proj:.2f}, {y_proj:.2f} ({self.source_crs})\n"
                               f"Lat: {lat:.6f}°, Lon: {lon:.6f}°")
             except Exception:
                 lon, lat = 0, 0
@@ -236,7 +236,7 @@ class ScrollableInsarViewer:
                 
                 # Write Metadata Header
                 writer.writerow(["# InSAR Time Series Data"])
-                writer.writerow(["# Source CRS", SOURCE_CRS])
+                writer.writerow(["# Source CRS", self.source_crs])
                 writer.writerow(["# Projected X", self.current_meta['x_proj']])
                 writer.writerow(["# Projected Y", self.current_meta['y_proj']])
                 writer.writerow(["# Latitude", self.current_meta['lat']])
@@ -1,48 +1,55 @@
-import geopandas as gpd
 import rasterio
 from rasterstats import zonal_stats
 import numpy as np
+from instrument import span
+import geo
 
-# 1. Load Buildings
-print("Loading vector file...")
 vector_path = 'clipped_output.geojson'
-buildings = gpd.read_file(vector_path)
+raster_path = '20_25_velocity.tif'
 
-# Reproject buildings to match raster EPSG (Standardize coordinates)
-buildings = buildings.to_crs(epsg=32644)
+# 1. Load Buildings
+# Buildings come back already projected to the raster's true CRS (read from the geo cache
+# after the first run, so there is no full reprojection here)
+print("Loading vector file...")
+raster_epsg = geo.raster_crs(raster_path)
+with span("load_buildings", unit="buildings") as s:
+    buildings = geo.load_vector(vector_path, raster_epsg)
+    s.count(len(buildings))
 
 # OPTIONAL: Test on just 50 buildings first to ensure it works!
 # buildings = buildings.head(50) 
 
 # 2. Load Raster into Memory (The Speed Fix)
-raster_path = '20_25_velocity.tif'
 
 print("Loading raster into RAM...")
-with rasterio.open(raster_path) as src:
+with span("load_raster", unit="pixels") as s, rasterio.open(raster_path) as src:
     # Read the data into a numpy array (Band 1)
     # This puts the whole image in RAM so we don't have to read the disk 10k times
     raster_array = src.read(1)
     raster_affine = src.transform
     raster_nodata = src.nodata
+    s.count(raster_array.size)
     
     # Quick check: Is the array massive?
     print(f"Raster size: {raster_array.shape}")
 
 # 3. Run Zonal Stats using the Array (Not the file path)
 print("Calculating stats (Fast Mode)...")
-stats = zonal_stats(
-    buildings,
-    raster_array,       # Pass the numpy array
-    affine=raster_affine, # Pass the geotransform
-    nodata=raster_nodata, # Handle empty pixels correctly
-    stats="mean",
-    all_touched=True
-)
+with span("zonal_stats", unit="buildings", items=len(buildings)):
+    stats = zonal_stats(
+        buildings,
+        raster_array,       # Pass the numpy array
+        affine=raster_affine, # Pass the geotransform
+        nodata=raster_nodata, # Handle empty pixels correctly
+        stats="mean",
+        all_touched=True
+    )
 
 # 4. Save
 buildings['velocity_mean'] = [x['mean'] for x in stats]
 print(f"Done! Processed {len(buildings)} buildings.")
-buildings.to_file('buildings_with_velocity.geojson', driver='GeoJSON')
+with span("save", unit="buildings", items=len(buildings)):
+    geo.save_vector(buildings, 'buildings_with_velocity.geojson', driver='GeoJSON')
 
 # import geopandas as gpd
 # import rasterio